@@ -1,4 +1,5 @@
 import math
+from functools import lru_cache
 
 # Tipos de Mensajes
 REQUEST = 'REQUEST'
@@ -8,23 +9,42 @@ LOCKED = 'LOCKED'
 FAILED = 'FAILED'
 INQUIRE = 'INQUIRE'
 RELINQUISH = 'RELINQUISH'
+PEER_DONE = 'PEER_DONE' # Control del simulador: el emisor ya no pedirá la CS
 
 NETWORK_DELAY = 1
+# Cada entrega tarda NETWORK_DELAY * uniform(1 - NETWORK_JITTER, 1 + NETWORK_JITTER): así el
+# orden de llegada puede diferir entre receptores (y Maekawa Light puede bloquearse)
+NETWORK_JITTER = 0.5
+NETWORK_SEED = 0
+# True: reloj virtual (eventos discretos), la simulación no espera los retardos reales
+VIRTUAL_TIME = True
+# False: no se genera log_*.txt (los nodos ni siquiera arman las entradas)
+LOG_ENABLED = False
 
+# Prioridad (ts, id) empaquetada en un entero: (ts << ID_BITS) | id
+ID_BITS = 32
+ID_MASK = (1 << ID_BITS) - 1
+
+@lru_cache(maxsize=8)
 def generate_maekawa_voting_sets(N):
-    if N == 0: return {}
+    # S_i por id de nodo; cacheado como tuplas (inmutables) para que ningún llamador altere la copia compartida
+    if N == 0: return ()
     k = int(math.ceil(math.sqrt(N)))
-    voting_sets = {}
+    voting_sets = []
     for i in range(N):
-        row = i // k
-        col = i % k
-        s_i = set()
-        for c in range(k): # Fila
-            member = row * k + c
-            if member < N: s_i.add(member)
-        for r in range(k): # Columna
-            member = r * k + col
-            if member < N: s_i.add(member)
-        s_i.add(i) # Self
-        voting_sets[i] = list(s_i)
-    return voting_sets
\ No newline at end of file
+        r, c = divmod(i, k)
+        row = range(r * k, min(r * k + k, N)) # Fila
+        col = range(c, N, k) # Columna (incluye al propio nodo)
+        voting_sets.append(tuple(sorted(set(row).union(col))))
+    return tuple(voting_sets)
+
+def maekawa_remote_quorum_avg(N):
+    """Tamaño medio de S_i sin contar al propio nodo, sin construir los quórums."""
+    k = int(math.ceil(math.sqrt(N)))
+    if N == k * k: return 2 * k - 2
+    # |S_i| = |fila| + |columna| - 1; promediando sobre los N nodos cada fila
+    # aporta |fila|^2 y cada columna |columna|^2
+    full_rows, last_row = divmod(N, k)
+    row_sq = full_rows * k * k + last_row * last_row
+    col_sq = last_row * (full_rows + 1) ** 2 + (k - last_row) * full_rows ** 2
+    return (row_sq + col_sq) / N - 2
@@ -1,160 +1,176 @@
 # maekawa.py
-import time
-import heapq
-from config import REQUEST, LOCKED, RELEASE, FAILED, INQUIRE, RELINQUISH, NETWORK_DELAY
+import bisect
+from config import REQUEST, LOCKED, RELEASE, FAILED, INQUIRE, RELINQUISH, PEER_DONE, ID_BITS, ID_MASK, LOG_ENABLED
 
-def run_maekawa(node_id, voting_set, queues, stats_queue, log_queue, cs_duration, start_delay, active_participant, use_inquire_optimization):
-    my_queue = queues[node_id]
+def run_maekawa(node_id, voting_set, network, stats_queue, stats, log_queue, cs_duration, start_delay, active_participant, use_inquire_optimization):
+    # Métricas
+    cs_entry, cs_exit, response_time, msg_count = stats
+    # Miembros remotos: los únicos que cuentan como mensajes enviados
+    remote_members = [m for m in voting_set if m != node_id]
     clock = 0
     msgs_sent_count = 0
     
     # Arbitro
     voted_for = None
-    voted_for_ts = float('inf')
-    request_queue = []
+    voted_for_key = None
+    request_queue = [] # Claves (ts << ID_BITS) | id ordenadas; a lo sumo |S_i| entradas
     sent_inquire_to = None
+    # Los quórums de la grilla son simétricos: solo remote_members pueden pedirnos el voto
+    done_peers = 0
     
     # Solicitante
-    received_votes = set()
     needed_votes = len(voting_set)
+    votes_remaining = needed_votes
+    # Quién nos votó solo importa para responder INQUIRE (Heavy)
+    received_votes = set() if use_inquire_optimization else None
     has_requested = False
     is_in_cs = False
     my_ts = 0
     req_start_time = 0
+    finished = not active_participant
 
-    time.sleep(start_delay)
+    # LOG (se envía al terminar)
+    log_buffer = []
+
+    network.sleep(node_id, start_delay)
 
     if active_participant:
         clock += 1
         my_ts = clock
         has_requested = True
-        req_start_time = time.perf_counter()
+        req_start_time = network.now()
         
         # REQUEST (Multicast al Voting Set)
-        time.sleep(NETWORK_DELAY) 
-        for member in voting_set:
-            queues[member].put((REQUEST, my_ts, node_id))
-            if member != node_id:
-                msgs_sent_count += 1
-                # LOG
-                log_queue.put(f"[MK] Node {node_id} -> Node {member}: REQUEST (TS={my_ts})")
+        network.multicast(node_id, voting_set, (REQUEST, my_ts, node_id))
+        msgs_sent_count += len(remote_members)
+        if LOG_ENABLED:
+            for member in remote_members:
+                log_buffer.append(("[MK] Node %d -> Node %d: REQUEST (TS=%d)", node_id, member, my_ts))
+    else:
+        # No cuenta como mensaje del algoritmo
+        network.multicast(node_id, remote_members, (PEER_DONE, clock, node_id))
 
     while True:
-        if active_participant and not has_requested and not is_in_cs and len(received_votes) == 0:
-             stats_queue.put(('DONE', node_id))
-             active_participant = False
+        # Salida anticipada: nadie más puede pedirnos el voto ni lo tenemos comprometido
+        if finished and done_peers == len(remote_members) and voted_for is None and not request_queue:
+            break
 
-        try: msg = my_queue.get(timeout=0.1)
-        except: continue
+        msg = network.recv(node_id)
         if msg == "STOP": break
 
         msg_type, src_ts, src_id = msg
+        # Control del simulador: no toca el reloj de Lamport
+        if msg_type == PEER_DONE:
+            done_peers += 1
+            continue
         clock = max(clock, src_ts) + 1
 
         # Lógica del Arbitro
         if msg_type == REQUEST:
+            new_key = (src_ts << ID_BITS) | src_id
             if voted_for is None:
                 # Voto
                 voted_for = src_id
-                voted_for_ts = src_ts
-                time.sleep(NETWORK_DELAY)
-                queues[src_id].put((LOCKED, clock, node_id))
+                voted_for_key = new_key
+                network.send(node_id, src_id, (LOCKED, clock, node_id))
                 if src_id != node_id:
                     msgs_sent_count += 1
-                    log_queue.put(f"[MK] Node {node_id} -> Node {src_id}: LOCKED")
+                    if LOG_ENABLED: log_buffer.append(("[MK] Node %d -> Node %d: LOCKED", node_id, src_id))
             else:
-                heapq.heappush(request_queue, (src_ts, src_id))
+                bisect.insort(request_queue, new_key)
                 
                 if use_inquire_optimization: # HEAVY DEMAND
-                    curr = (voted_for_ts, voted_for)
-                    new = (src_ts, src_id)
                     # Si el nuevo tiene prioridad, recuperar el voto
-                    if new < curr and sent_inquire_to != voted_for:
-                        time.sleep(NETWORK_DELAY)
-                        queues[voted_for].put((INQUIRE, clock, node_id))
+                    if new_key < voted_for_key and sent_inquire_to != voted_for:
+                        network.send(node_id, voted_for, (INQUIRE, clock, node_id))
                         if voted_for != node_id:
                             msgs_sent_count += 1
-                            log_queue.put(f"[MK] Node {node_id} -> Node {voted_for}: INQUIRE")
+                            if LOG_ENABLED: log_buffer.append(("[MK] Node %d -> Node %d: INQUIRE", node_id, voted_for))
                         sent_inquire_to = voted_for
                     else:
                         # En Heavy sí enviamos FAILED
-                        queues[src_id].put((FAILED, clock, node_id)) 
+                        network.send(node_id, src_id, (FAILED, clock, node_id))
                         if src_id != node_id:
                             msgs_sent_count += 1
-                            log_queue.put(f"[MK] Node {node_id} -> Node {src_id}: FAILED")
+                            if LOG_ENABLED: log_buffer.append(("[MK] Node %d -> Node %d: FAILED", node_id, src_id))
                 else: # LIGHT DEMAND
                     pass
 
         elif msg_type == RELEASE:
             if src_id == voted_for:
                 voted_for = None
-                voted_for_ts = float('inf')
+                voted_for_key = None
                 sent_inquire_to = None
                 if request_queue:
-                    next_ts, next_node = heapq.heappop(request_queue)
+                    voted_for_key = request_queue.pop(0)
+                    next_node = voted_for_key & ID_MASK
                     voted_for = next_node
-                    voted_for_ts = next_ts
-                    time.sleep(NETWORK_DELAY)
-                    queues[next_node].put((LOCKED, clock, node_id))
+                    network.send(node_id, next_node, (LOCKED, clock, node_id))
                     if next_node != node_id:
                         msgs_sent_count += 1
-                        log_queue.put(f"[MK] Node {node_id} -> Node {next_node}: LOCKED (Handoff)")
+                        if LOG_ENABLED: log_buffer.append(("[MK] Node %d -> Node %d: LOCKED (Handoff)", node_id, next_node))
 
         elif msg_type == RELINQUISH:
             if src_id == voted_for:
-                heapq.heappush(request_queue, (voted_for_ts, voted_for))
+                bisect.insort(request_queue, voted_for_key)
                 voted_for = None
-                voted_for_ts = float('inf')
+                voted_for_key = None
                 sent_inquire_to = None
                 if request_queue:
-                    next_ts, next_node = heapq.heappop(request_queue)
+                    voted_for_key = request_queue.pop(0)
+                    next_node = voted_for_key & ID_MASK
                     voted_for = next_node
-                    voted_for_ts = next_ts
-                    time.sleep(NETWORK_DELAY)
-                    queues[next_node].put((LOCKED, clock, node_id))
+                    network.send(node_id, next_node, (LOCKED, clock, node_id))
                     if next_node != node_id:
                         msgs_sent_count += 1
-                        log_queue.put(f"[MK] Node {node_id} -> Node {next_node}: LOCKED (Post-Relinquish)")
+                        if LOG_ENABLED: log_buffer.append(("[MK] Node %d -> Node %d: LOCKED (Post-Relinquish)", node_id, next_node))
+
 
         # Lógica del Solicitante
         if has_requested:
             if msg_type == LOCKED:
-                received_votes.add(src_id)
-                if len(received_votes) == needed_votes:
+                votes_remaining -= 1
+                if use_inquire_optimization: received_votes.add(src_id)
+                if votes_remaining == 0:
                     is_in_cs = True
                     has_requested = False
-                    entry_time = time.perf_counter()
-                    stats_queue.put(('CS_ENTRY', entry_time))
-                    stats_queue.put(('RESPONSE_TIME', entry_time - req_start_time))
-                    log_queue.put(f"[MK] Node {node_id} *** ENTERING CS ***")
+                    entry_time = network.now()
+                    cs_entry[node_id] = entry_time
+                    response_time[node_id] = entry_time - req_start_time
+                    if LOG_ENABLED: log_buffer.append(("[MK] Node %d *** ENTERING CS ***", node_id))
                     
-                    time.sleep(cs_duration)
+                    network.sleep(node_id, cs_duration)
                     
-                    exit_time = time.perf_counter()
-                    stats_queue.put(('CS_EXIT', exit_time))
-                    log_queue.put(f"[MK] Node {node_id} *** EXITING CS ***")
+                    exit_time = network.now()
+                    cs_exit[node_id] = exit_time
+                    if LOG_ENABLED: log_buffer.append(("[MK] Node %d *** EXITING CS ***", node_id))
                     
                     is_in_cs = False
-                    received_votes.clear()
+                    votes_remaining = needed_votes
+                    if use_inquire_optimization: received_votes.clear()
                     
                     # RELEASE (Multicast al Voting Set)
-                    time.sleep(NETWORK_DELAY)
-                    for member in voting_set:
-                        queues[member].put((RELEASE, clock, node_id))
-                        if member != node_id:
-                            msgs_sent_count += 1
-                            log_queue.put(f"[MK] Node {node_id} -> Node {member}: RELEASE")
+                    network.multicast(node_id, voting_set, (RELEASE, clock, node_id))
+                    msgs_sent_count += len(remote_members)
+                    if LOG_ENABLED:
+                        for member in remote_members:
+                            log_buffer.append(("[MK] Node %d -> Node %d: RELEASE", node_id, member))
+                    stats_queue.put(('DONE', node_id))
+                    network.multicast(node_id, remote_members, (PEER_DONE, clock, node_id))
+                    finished = True
             
             elif msg_type == INQUIRE and use_inquire_optimization:
                 if not is_in_cs and src_id in received_votes:
                     received_votes.remove(src_id)
-                    time.sleep(NETWORK_DELAY)
-                    queues[src_id].put((RELINQUISH, clock, node_id))
+                    votes_remaining += 1
+                    network.send(node_id, src_id, (RELINQUISH, clock, node_id))
                     if src_id != node_id:
                         msgs_sent_count += 1
-                        log_queue.put(f"[MK] Node {node_id} -> Node {src_id}: RELINQUISH")
+                        if LOG_ENABLED: log_buffer.append(("[MK] Node %d -> Node %d: RELINQUISH", node_id, src_id))
             
             elif msg_type == FAILED:
                 pass
 
-    stats_queue.put(('MSG_COUNT', msgs_sent_count))
\ No newline at end of file
+    if LOG_ENABLED: log_queue.put(log_buffer)
+    msg_count[node_id] = msgs_sent_count
+    stats_queue.put(('DRAINED', node_id))
\ No newline at end of file
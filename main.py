@@ -1,37 +1,39 @@
 # main.py
-import multiprocessing
+import threading
 import time
 import math
 import queue
-from config import generate_maekawa_voting_sets, NETWORK_DELAY
+from config import generate_maekawa_voting_sets, maekawa_remote_quorum_avg, NETWORK_DELAY, VIRTUAL_TIME, LOG_ENABLED
 from ricart_agrawala import run_ricart_agrawala
 from maekawa import run_maekawa
+from network import RealTimeNetwork, VirtualTimeNetwork
+
+# Separadores del reporte (se arman una sola vez)
+SEPARATOR = "=" * 70
+SUB_SEPARATOR = "-" * 70
+ALERT_LINE = "!" * 60
 
 def log_writer(log_queue, filename):
-    """Proceso dedicado a escribir logs en archivo para no bloquear la simulación."""
+    """Hilo dedicado a escribir logs en archivo para no bloquear la simulación."""
     with open(filename, 'w') as f:
         while True:
             msg = log_queue.get()
             if msg == "STOP_LOG":
                 break
-            f.write(msg + '\n')
+            # Cada entrada es (plantilla, *campos): el formateo se hace aquí y no en los nodos.
+            # Cada nodo acumula sus entradas y las envía como una sola lista al terminar
+            entries = msg if isinstance(msg, list) else [msg]
+            for entry in entries:
+                f.write(entry[0] % entry[1:] + '\n')
             f.flush()
 
-def print_detailed_metrics(algo_name, collected_stats, N, k_active, E):
-    total_msgs = 0
-    entries = []
-    exits = []
-    response_times = []
-    
-    sorted_events = sorted(collected_stats, key=lambda x: x[1] if isinstance(x[1], float) else 0)
-    
-    for item in sorted_events:
-        tag = item[0]
-        val = item[1]
-        if tag == 'MSG_COUNT': total_msgs += val
-        elif tag == 'CS_ENTRY': entries.append(val)
-        elif tag == 'CS_EXIT': exits.append(val)
-        elif tag == 'RESPONSE_TIME': response_times.append(val)
+def print_detailed_metrics(algo_name, stats, N, k_active, E):
+    cs_entry, cs_exit, response_time, msg_count = stats
+    # Los nodos que no entraron a la CS dejan su posición en None
+    total_msgs = sum(msg_count)
+    entries = [t for t in cs_entry if t is not None]
+    exits = [t for t in cs_exit if t is not None]
+    response_times = [t for t in response_time if t is not None]
 
     avg_msgs = total_msgs / k_active if k_active > 0 else 0
     avg_resp = sum(response_times) / len(response_times) if response_times else 0
@@ -53,9 +55,7 @@ def print_detailed_metrics(algo_name, collected_stats, N, k_active, E):
         theory_avg = 2 * (N - 1)
     else:
         # Calcular K real basado en la topología de Grid generada
-        voting_sets = generate_maekawa_voting_sets(N)
-        k_sizes_remote = [len(v_set) - 1 for v_set in voting_sets.values()]
-        K_remote_avg = sum(k_sizes_remote) / len(k_sizes_remote)
+        K_remote_avg = maekawa_remote_quorum_avg(N)
         
         if "Light" in algo_name:
             # Flujo: Request(K) + Locked(K) + Release(K)
@@ -66,107 +66,121 @@ def print_detailed_metrics(algo_name, collected_stats, N, k_active, E):
 
     theory_total = theory_avg * k_active
 
-    print("\n" + "="*70)
+    print("\n" + SEPARATOR)
     print(f" RESULTADOS MÉTRICAS: {algo_name}")
-    print("="*70)
+    print(SEPARATOR)
     print(f"Configuración: N={N}, k={k_active}, E={E}s")
-    print("-" * 70)
+    print(SUB_SEPARATOR)
     print(f"[1] COMPLEJIDAD DE MENSAJES")
     print(f"    Total Sistema    : {total_msgs} (Teórico: ~{theory_total:.1f})")
     print(f"    Promedio por CS  : {avg_msgs:.1f} (Teórico: ~{theory_avg:.1f})")
     
-    print("-" * 70)
+    print(SUB_SEPARATOR)
     print(f"[2] SYNCHRONIZATION DELAY (SD) : {avg_sd:.4f} s")
     print(f"[3] RESPONSE TIME PROMEDIO     : {avg_resp:.4f} s")
     print(f"[4] SYSTEM THROUGHPUT          : {throughput:.4f}")
-    print("="*70 + "\n")
+    print(SEPARATOR + "\n")
 
 def run_simulation(algo_type, N, k_active, E):
     print(f"\n>>> En Ejecución: {algo_type} <<<")
-    manager = multiprocessing.Manager()
-    queues = [manager.Queue() for _ in range(N)]
-    stats_queue = manager.Queue()
+    # Los nodos son hilos que solo esperan en la red y en sleep: sin IPC
+    # stats_queue solo lleva control (DONE, DRAINED, IDLE); las métricas van a listas por nodo
+    stats_queue = queue.SimpleQueue()
+    # Métricas por nodo (cs_entry, cs_exit, response_time, msg_count): cada nodo solo escribe
+    # en su índice; None queda para los que no entraron a la CS
+    stats = ([None] * N, [None] * N, [None] * N, [0] * N)
+    
+    # --- RED SIMULADA ---
+    if VIRTUAL_TIME:
+        # La red avisa cuando todos los nodos esperan y ya no queda nada en vuelo
+        network = VirtualTimeNetwork(N, on_idle=lambda: stats_queue.put(('IDLE', None)))
+    else:
+        network = RealTimeNetwork(N)
+    network.start()
     
     # --- SISTEMA DE LOGS ---
-    log_queue = manager.Queue()
+    log_queue = queue.SimpleQueue()
     # Limpiamos el nombre para el archivo
     filename = f"log_{algo_type.replace(' ', '_').replace('(', '').replace(')', '')}.txt"
-    logger_proc = multiprocessing.Process(target=log_writer, args=(log_queue, filename))
-    logger_proc.start()
+    if LOG_ENABLED:
+        logger_thread = threading.Thread(target=log_writer, args=(log_queue, filename), daemon=True)
+        logger_thread.start()
     
-    collected_stats = []
     active_ids = list(range(k_active))
-    processes = []
+    threads = []
     
     if "Ricart" in algo_type:
         for i in range(N):
             is_active = i in active_ids
-            p = multiprocessing.Process(target=run_ricart_agrawala, args=(i, N, queues, stats_queue, log_queue, E, 0, is_active))
-            processes.append(p)
+            t = threading.Thread(target=network.run_node, args=(i, run_ricart_agrawala, i, N, network, stats_queue, stats, log_queue, E, 0, is_active), daemon=True)
+            threads.append(t)
             
     elif "Maekawa" in algo_type:
         voting_sets = generate_maekawa_voting_sets(N)
         for i in range(N):
             is_active = i in active_ids
             start_delay = 0
-            use_opt = False
-            
-            if is_active:
-                if "Light" in algo_type:
-                    start_delay = 0 
-                    use_opt = False
-                else:
-                    start_delay = 0
-                    use_opt = True
+            # INQUIRE/FAILED es lógica del árbitro: también la aplican los nodos pasivos
+            use_opt = "Light" not in algo_type
 
-            p = multiprocessing.Process(target=run_maekawa, args=(i, voting_sets[i], queues, stats_queue, log_queue, E, start_delay, is_active, use_opt))
-            processes.append(p)
+            t = threading.Thread(target=network.run_node, args=(i, run_maekawa, i, voting_sets[i], network, stats_queue, stats, log_queue, E, start_delay, is_active, use_opt), daemon=True)
+            threads.append(t)
 
-    for p in processes: p.start()
+    for t in threads: t.start()
     
     TIMEOUT_LIMIT = (k_active * (E + (15 * NETWORK_DELAY))) + 45 # Timeout
     print(f"Esperando finalización (Timeout: {TIMEOUT_LIMIT:.1f}s)...")
 
-    start_t = time.time()
+    start_t = time.perf_counter()
     done_count = 0
+    drained = 0 # Los nodos de Maekawa pueden terminar antes del STOP
     deadlock_detected = False
     
     while done_count < k_active:
-        if time.time() - start_t > TIMEOUT_LIMIT:
-            print("\n" + "!"*60)
+        remaining = TIMEOUT_LIMIT - (time.perf_counter() - start_t)
+        stalled = remaining <= 0
+        if not stalled:
+            # Bloqueante: despierta en cuanto llega una estadística (o al vencer el timeout)
+            try: item = stats_queue.get(timeout=remaining)
+            except queue.Empty: continue
+            # En tiempo virtual la red detecta la espera circular sin agotar el timeout
+            stalled = item[0] == 'IDLE'
+        if stalled:
+            reason = "TIMEOUT ALCANZADO" if remaining <= 0 else "RED INACTIVA"
+            print("\n" + ALERT_LINE)
             if "Light" in algo_type:
-                print(" TIMEOUT ALCANZADO (DEADLOCK)")
+                print(f" {reason} (DEADLOCK)")
                 print(" Maekawa Under Light se bloqueó por espera circular.")
-                log_queue.put("!!! DEADLOCK DETECTADO - TIMEOUT !!!")
+                if LOG_ENABLED: log_queue.put(("!!! DEADLOCK DETECTADO - %s !!!", reason))
             else:
-                print(" ERROR: TIMEOUT ALCANZADO")
-            print("!"*60 + "\n")
+                print(f" ERROR: {reason}")
+            print(ALERT_LINE + "\n")
             deadlock_detected = True
             break
-        try:
-            while True:
-                item = stats_queue.get_nowait()
-                collected_stats.append(item)
-                if item[0] == 'DONE': done_count += 1
-        except queue.Empty: time.sleep(0.1)
+        if item[0] == 'DRAINED': drained += 1
+        elif item[0] == 'DONE': done_count += 1
         
-    for q in queues: q.put("STOP")
-    time.sleep(1)
+    network.stop()
     
-    # Detener Logger
-    log_queue.put("STOP_LOG")
-    logger_proc.join()
-    print(f"--> Log guardado en: {filename}")
-
-    try:
-        while not stats_queue.empty(): collected_stats.append(stats_queue.get_nowait())
-    except: pass
+    # Cada nodo confirma con DRAINED tras escribir sus últimas estadísticas
+    while drained < N:
+        try: item = stats_queue.get(timeout=E + 1)
+        except queue.Empty: break
+        if item[0] == 'DRAINED': drained += 1
+    
+    # Un hilo no se puede terminar a la fuerza: los rezagados son daemon y no bloquean la salida
+    for t in threads:
+        t.join(timeout=0.5)
+    network.join(timeout=0.5)
     
-    for p in processes: 
-        if p.is_alive(): p.terminate()
+    # Detener Logger
+    if LOG_ENABLED:
+        log_queue.put("STOP_LOG")
+        logger_thread.join()
+        print(f"--> Log guardado en: {filename}")
         
     if not deadlock_detected:
-        print_detailed_metrics(algo_type, collected_stats, N, k_active, E)
+        print_detailed_metrics(algo_type, stats, N, k_active, E)
 
 def main():
     try:
@@ -177,9 +191,9 @@ def main():
 
     scenarios = ["Ricart-Agrawala", "Maekawa (Light Demand)", "Maekawa (Heavy Demand)"] 
     
+    # run_simulation vuelve tras recibir DRAINED de cada nodo: el siguiente escenario no necesita pausa
     for sc in scenarios:
         run_simulation(sc, N, k, E)
-        time.sleep(2)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,200 @@
+# network.py
+import time
+import heapq
+import random
+import queue
+import threading
+from collections import deque
+from config import NETWORK_DELAY, NETWORK_JITTER, NETWORK_SEED
+
+def _delay(rng):
+    return NETWORK_DELAY * rng.uniform(1 - NETWORK_JITTER, 1 + NETWORK_JITTER)
+
+def _channels(n_nodes):
+    """Estado por emisor: un generador de retardos y el último instante de entrega por destino.
+
+    Un generador por emisor hace que el sorteo solo dependa del orden de los envíos de ese
+    nodo (secuenciales en su hilo), no de cómo se intercalan los hilos.
+    """
+    rngs = [random.Random(NETWORK_SEED * n_nodes + i) for i in range(n_nodes)]
+    last_delivery = [[0.0] * n_nodes for _ in range(n_nodes)]
+    return rngs, last_delivery
+
+def _deliver_at(rng, last, dst, now):
+    """Instante de entrega hacia dst de un mensaje enviado en `now`.
+
+    El jitter puede reordenar entre canales (dos receptores ven distinto orden), nunca
+    dentro de uno: el protocolo asume canales FIFO (p. ej. LOCKED antes que INQUIRE).
+    """
+    last[dst] = max(now + _delay(rng), last[dst])
+    return last[dst]
+
+class RealTimeNetwork:
+    """Red en tiempo real: un hilo broker retiene cada mensaje ~NETWORK_DELAY segundos de reloj."""
+
+    def __init__(self, n_nodes):
+        self.inboxes = [queue.SimpleQueue() for _ in range(n_nodes)]
+        self.in_flight = queue.SimpleQueue()
+        self.stop_event = threading.Event()
+        self.rngs, self.last_delivery = _channels(n_nodes)
+        self.broker = threading.Thread(target=self._run, daemon=True)
+
+    def now(self):
+        return time.perf_counter()
+
+    def send(self, node_id, dst, msg):
+        """Envía sin bloquear: el retardo de red lo aplica el broker."""
+        self.multicast(node_id, (dst,), msg)
+
+    def multicast(self, node_id, dsts, msg):
+        """Un solo envío al broker; cada destino recibe con su propio retardo."""
+        now = time.perf_counter()
+        rng, last = self.rngs[node_id], self.last_delivery[node_id]
+        self.in_flight.put((msg, [(_deliver_at(rng, last, dst, now), dst) for dst in dsts]))
+
+    def recv(self, node_id):
+        # Tras stop() no se procesa lo que quede en la cola
+        if self.stop_event.is_set(): return "STOP"
+        return self.inboxes[node_id].get()
+
+    def sleep(self, node_id, seconds):
+        self.stop_event.wait(seconds) # Interrumpible por stop()
+
+    def run_node(self, node_id, target, *args):
+        target(*args)
+
+    def start(self):
+        self.broker.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.in_flight.put(None) # Despierta al broker
+        # Un get() bloqueado no ve el Event: un único STOP por nodo para despertarlo
+        for inbox in self.inboxes: inbox.put("STOP")
+
+    def join(self, timeout=None):
+        self.broker.join(timeout)
+
+    def _run(self):
+        pending = [] # heap de (deliver_at, seq, dst, msg)
+        seq = 0
+        while not self.stop_event.is_set():
+            # Dormir solo hasta el próximo vencimiento (o hasta que llegue algo nuevo)
+            timeout = max(0, pending[0][0] - time.perf_counter()) if pending else None
+            try: item = self.in_flight.get(timeout=timeout)
+            except queue.Empty: item = None
+
+            if item is not None:
+                msg, deliveries = item
+                for deliver_at, dst in deliveries:
+                    heapq.heappush(pending, (deliver_at, seq, dst, msg))
+                    seq += 1
+
+            now = time.perf_counter()
+            while pending and pending[0][0] <= now:
+                _, _, dst, msg = heapq.heappop(pending)
+                self.inboxes[dst].put(msg)
+
+class VirtualTimeNetwork:
+    """Simulación de eventos discretos: el reloj virtual solo avanza cuando todos los nodos esperan.
+
+    Cada nodo bloqueado (en recv o en sleep) descuenta de `running`; el último en
+    bloquearse salta al siguiente evento (entrega o despertar) y reactiva a sus
+    destinatarios. `on_idle` se invoca si todos esperan y no queda ningún evento.
+    """
+
+    WAKE = object() # Evento de fin de sleep
+
+    def __init__(self, n_nodes, on_idle=None):
+        self.lock = threading.Lock()
+        self.wakeups = [threading.Condition(self.lock) for _ in range(n_nodes)]
+        self.inboxes = [deque() for _ in range(n_nodes)]
+        self.blocked = [None] * n_nodes # None, 'recv' o 'sleep'
+        self.running = n_nodes
+        self.events = [] # heap de (vt, seq, dst, msg)
+        self.seq = 0
+        self.vt = 0.0
+        self.stop_event = threading.Event()
+        self.on_idle = on_idle
+        self.rngs, self.last_delivery = _channels(n_nodes)
+
+    def now(self):
+        return self.vt
+
+    def send(self, node_id, dst, msg):
+        self.multicast(node_id, (dst,), msg)
+
+    def multicast(self, node_id, dsts, msg):
+        rng, last = self.rngs[node_id], self.last_delivery[node_id]
+        with self.lock:
+            for dst in dsts:
+                self._schedule(_deliver_at(rng, last, dst, self.vt), dst, msg)
+
+    def recv(self, node_id):
+        with self.lock:
+            inbox = self.inboxes[node_id]
+            if not inbox:
+                self._block(node_id, 'recv')
+            if self.stop_event.is_set(): return "STOP"
+            return inbox.popleft()
+
+    def sleep(self, node_id, seconds):
+        if seconds <= 0: return
+        with self.lock:
+            self._schedule(self.vt + seconds, node_id, self.WAKE)
+            self._block(node_id, 'sleep')
+
+    def run_node(self, node_id, target, *args):
+        try: target(*args)
+        finally:
+            # Un nodo que termina deja de contar para el avance del reloj
+            with self.lock:
+                self.running -= 1
+                self._advance()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        with self.lock:
+            self.stop_event.set()
+            # Los nodos bloqueados revisan el Event al despertar: no hace falta encolar STOP
+            for node_id in range(len(self.inboxes)):
+                self._unblock(node_id)
+
+    def join(self, timeout=None):
+        pass
+
+    # --- Internos (se llaman con self.lock tomado) ---
+
+    def _schedule(self, at, dst, msg):
+        heapq.heappush(self.events, (at, self.seq, dst, msg))
+        self.seq += 1
+
+    def _block(self, node_id, reason):
+        if self.stop_event.is_set(): return
+        self.blocked[node_id] = reason
+        self.running -= 1
+        self._advance()
+        while self.blocked[node_id] is not None:
+            self.wakeups[node_id].wait()
+
+    def _unblock(self, node_id):
+        if self.blocked[node_id] is not None:
+            self.blocked[node_id] = None
+            self.running += 1
+            self.wakeups[node_id].notify()
+
+    def _advance(self):
+        while self.running == 0 and self.events and not self.stop_event.is_set():
+            # Entregar todos los eventos del siguiente instante virtual
+            self.vt = self.events[0][0]
+            while self.events and self.events[0][0] == self.vt:
+                _, _, dst, msg = heapq.heappop(self.events)
+                if msg is self.WAKE:
+                    if self.blocked[dst] == 'sleep': self._unblock(dst)
+                else:
+                    self.inboxes[dst].append(msg)
+                    if self.blocked[dst] == 'recv': self._unblock(dst)
+        if self.running == 0 and not self.events and not self.stop_event.is_set() and self.on_idle:
+            self.on_idle()
@@ -1,96 +1,96 @@
 # ricart_agrawala.py
-import time
-from config import REQUEST, REPLY, NETWORK_DELAY
+from config import REQUEST, REPLY, ID_BITS, LOG_ENABLED
 
-def run_ricart_agrawala(node_id, total_nodes, queues, stats_queue, log_queue, cs_duration, start_delay, active_participant):
-    my_queue = queues[node_id]
+def run_ricart_agrawala(node_id, total_nodes, network, stats_queue, stats, log_queue, cs_duration, start_delay, active_participant):
+    # Métricas
+    cs_entry, cs_exit, response_time, msg_count = stats
     clock = 0
     msgs_sent_count = 0
+
+    # LOG (se envía al terminar)
+    log_buffer = []
     
-    time.sleep(start_delay)
+    network.sleep(node_id, start_delay)
 
     if active_participant:
         # 1. SOLICITUD
         clock += 1
         my_ts = clock
+        my_key = (my_ts << ID_BITS) | node_id
         replies_needed = total_nodes - 1
         replies_received = 0
         deferred_nodes = []
         
-        req_start_time = time.perf_counter()
+        req_start_time = network.now()
         
         # --- (BROADCAST) ---
-        time.sleep(NETWORK_DELAY) 
-        for i in range(total_nodes):
-            if i != node_id:
-                queues[i].put((REQUEST, my_ts, node_id))
-                msgs_sent_count += 1
-                # LOG
-                log_queue.put(f"[RA] Node {node_id} -> Node {i}: REQUEST (TS={my_ts})")
+        peers = [i for i in range(total_nodes) if i != node_id]
+        network.multicast(node_id, peers, (REQUEST, my_ts, node_id))
+        msgs_sent_count += len(peers)
+        if LOG_ENABLED:
+            for i in peers:
+                log_buffer.append(("[RA] Node %d -> Node %d: REQUEST (TS=%d)", node_id, i, my_ts))
 
         requesting = True
         
         # 2. ESPERA
         while replies_received < replies_needed:
-            msg = my_queue.get()
-            if msg == "STOP": return
+            msg = network.recv(node_id)
+            if msg == "STOP":
+                if LOG_ENABLED: log_queue.put(log_buffer)
+                stats_queue.put(('DRAINED', node_id))
+                return
             msg_type, src_ts, src_id = msg
             clock = max(clock, src_ts) + 1
             
             if msg_type == REQUEST:
-                my_priority = (my_ts, node_id)
-                other_priority = (src_ts, src_id)
+                other_key = (src_ts << ID_BITS) | src_id
                 
-                if requesting and (my_priority < other_priority):
+                if requesting and (my_key < other_key):
                     deferred_nodes.append(src_id)
-                    log_queue.put(f"[RA] Node {node_id}: DEFERRED Request from Node {src_id}")
+                    if LOG_ENABLED: log_buffer.append(("[RA] Node %d: DEFERRED Request from Node %d", node_id, src_id))
                 else:
-                    time.sleep(NETWORK_DELAY)
-                    queues[src_id].put((REPLY, clock, node_id))
+                    network.send(node_id, src_id, (REPLY, clock, node_id))
                     msgs_sent_count += 1
-                    # LOG
-                    log_queue.put(f"[RA] Node {node_id} -> Node {src_id}: REPLY (TS={clock})")
+                    if LOG_ENABLED: log_buffer.append(("[RA] Node %d -> Node %d: REPLY (TS=%d)", node_id, src_id, clock))
             
             elif msg_type == REPLY:
                 replies_received += 1
 
         # 3. SECCIÓN CRÍTICA
-        entry_time = time.perf_counter()
-        stats_queue.put(('CS_ENTRY', entry_time))
-        stats_queue.put(('RESPONSE_TIME', entry_time - req_start_time))
-        log_queue.put(f"[RA] Node {node_id} *** ENTERING CS ***")
+        entry_time = network.now()
+        cs_entry[node_id] = entry_time
+        response_time[node_id] = entry_time - req_start_time
+        if LOG_ENABLED: log_buffer.append(("[RA] Node %d *** ENTERING CS ***", node_id))
         
-        time.sleep(cs_duration)
+        network.sleep(node_id, cs_duration)
         
-        exit_time = time.perf_counter()
-        stats_queue.put(('CS_EXIT', exit_time))
-        log_queue.put(f"[RA] Node {node_id} *** EXITING CS ***")
+        exit_time = network.now()
+        cs_exit[node_id] = exit_time
+        if LOG_ENABLED: log_buffer.append(("[RA] Node %d *** EXITING CS ***", node_id))
         
         requesting = False
         
         # 4. SALIDA (REPLY A DIFERIDOS)
         if deferred_nodes:
-            time.sleep(NETWORK_DELAY)
-            for target_id in deferred_nodes:
-                queues[target_id].put((REPLY, clock, node_id))
-                msgs_sent_count += 1
-                # LOG
-                log_queue.put(f"[RA] Node {node_id} -> Node {target_id}: REPLY (Deferred)")
+            network.multicast(node_id, deferred_nodes, (REPLY, clock, node_id))
+            msgs_sent_count += len(deferred_nodes)
+            if LOG_ENABLED:
+                for target_id in deferred_nodes:
+                    log_buffer.append(("[RA] Node %d -> Node %d: REPLY (Deferred)", node_id, target_id))
             
         stats_queue.put(('DONE', node_id))
 
     while True:
-        try:
-            msg = my_queue.get(timeout=0.5)
-            if msg == "STOP": break
-            msg_type, src_ts, src_id = msg
-            clock = max(clock, src_ts) + 1
-            if msg_type == REQUEST:
-                time.sleep(NETWORK_DELAY)
-                queues[src_id].put((REPLY, clock, node_id))
-                msgs_sent_count += 1
-                # LOG
-                log_queue.put(f"[RA] Node {node_id} -> Node {src_id}: REPLY (Passive)")
-        except: pass
+        msg = network.recv(node_id)
+        if msg == "STOP": break
+        msg_type, src_ts, src_id = msg
+        clock = max(clock, src_ts) + 1
+        if msg_type == REQUEST:
+            network.send(node_id, src_id, (REPLY, clock, node_id))
+            msgs_sent_count += 1
+            if LOG_ENABLED: log_buffer.append(("[RA] Node %d -> Node %d: REPLY (Passive)", node_id, src_id))
 
-    stats_queue.put(('MSG_COUNT', msgs_sent_count))
\ No newline at end of file
+    if LOG_ENABLED: log_queue.put(log_buffer)
+    msg_count[node_id] = msgs_sent_count
+    stats_queue.put(('DRAINED', node_id))
\ No newline at end of file